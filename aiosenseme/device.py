@@ -21,8 +21,8 @@ import inspect
 import logging
 import random
 import re
-import traceback
-from typing import Any, Callable, Coroutine
+import socket
+from typing import Any, Callable, Iterable, Iterator
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -78,27 +78,142 @@ DEVICE_TYPES = {
     "LIGHT,HAIKU": "LIGHT",
 }
 
+MODEL_NAMES = tuple(dict.fromkeys(DEVICE_MODELS.values()))
+
 IGNORE_MODELS = [
     "SWITCH,SENSEME",
 ]
 
 SUPPRESS_CALLBACK_PARAMS = {"SLEEP;EVENT"}
 
-COMMAND_RE = re.compile(r"\((?:\\.|[^(\)\\])*\)")
+# commands sent to request the complete device state
+UPDATE_COMMANDS = ("DEVICE;ID;GET", "SNSROCC;STATUS;GET", "GETALL")
+
+# parameters whose value holds more than one ';' separated field, by key prefix
+MULTI_VALUE_PARAMS = {
+    "FAN;BOOKENDS": 2,
+    "LIGHT;BOOKENDS": 2,
+    "NW;PARAMS;ACTUAL": 3,
+    "DEVICE;ID": 2,
+}
+MULTI_VALUE_PREFIXES = (*MULTI_VALUE_PARAMS, "DEVICE;LIGHT")
+
+RECEIVE_QUEUE_SIZE = 256
+MAX_CONNECT_RETRY_SECONDS = 60
+MAX_ERROR_RETRY_SECONDS = 30
+# probe an idle connection after 30s, every 10s, give up after 3 missed probes
+KEEPALIVE_OPTIONS = (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+
+COMMAND_RE = re.compile(rb"\(((?:\\.|[^(\)\\])*)\)")
 
 
 def forceToRange(minv, maxv, val):
     return min(maxv, max(minv, val))
 
 
+def _encode_command(cmd: str) -> bytes:
+    """Encode a command to follow a device's command prefix."""
+    return f"{cmd}>".encode("utf-8")
+
+
+def _on_off_commands(param: str) -> dict[bool, bytes]:
+    """Return the encoded commands turning a parameter on and off by state."""
+    return {
+        True: _encode_command(f"{param};ON"),
+        False: _encode_command(f"{param};OFF"),
+    }
+
+
+# pre-encoded commands for setters that only take a few values
+INDICATORS_COMMANDS = _on_off_commands("DEVICE;INDICATORS")
+BEEPER_COMMANDS = _on_off_commands("DEVICE;BEEPER")
+LIGHT_POWER_COMMANDS = _on_off_commands("LIGHT;PWR")
+LIGHT_AUTO_COMMANDS = _on_off_commands("LIGHT;AUTO")
+SLEEP_COMMANDS = _on_off_commands("SLEEP;STATE")
+FAN_POWER_COMMANDS = _on_off_commands("FAN;PWR")
+FAN_WHOOSH_COMMANDS = _on_off_commands("FAN;WHOOSH")
+FAN_AUTO_COMMANDS = _on_off_commands("FAN;AUTO")
+AUTOCOMFORT_COMMANDS = _on_off_commands("SMARTMODE;STATE;SET")
+FAN_DIR_COMMANDS = {
+    direction: _encode_command(f"FAN;DIR;SET;{direction}") for direction in DIRECTIONS
+}
+SMARTMODE_COMMANDS = {
+    mode: _encode_command(f"SMARTMODE;STATE;SET;{mode}") for mode in AUTOCOMFORTS
+}
+
+
+def _split_values(raw: str) -> tuple[str, ...]:
+    """Split a multi-value parameter into its values."""
+    return tuple(raw.split(";"))
+
+
+def _parse_on(raw: str) -> bool:
+    """Parse an ON/OFF parameter."""
+    return raw == "ON"
+
+
+def _parse_occupied(raw: str) -> bool:
+    """Parse an OCCUPIED/UNOCCUPIED parameter."""
+    return raw == "OCCUPIED"
+
+
+def _parse_temperature(raw: str) -> float:
+    """Parse a temperature reported in hundredths of a degree Celsius."""
+    return int(raw) / 100.0
+
+
+def _parse_bookends(raw: str) -> tuple[int, int] | None:
+    """Parse a min/max bookends parameter."""
+    values = raw.split(";")
+    if len(values) != 2:
+        return None
+    return int(values[0]), int(values[1])
+
+
+class _FrameParser:
+    """Incremental parser for the SenseME message stream.
+
+    Messages are parenthesized and may arrive split across or packed into
+    reads. Completed messages are decoded once, partial messages are kept
+    until the rest arrives.
+    """
+
+    def __init__(self) -> None:
+        """Initialize frame parser."""
+        self._buf = bytearray()
+
+    def feed(self, data: bytes) -> None:
+        """Add data received from the device."""
+        self._buf += data
+
+    def iter_frames(self) -> Iterator[str]:
+        """Return an iterator over the complete messages received so far.
+
+        The enclosing parentheses are not included.
+        """
+        buf = self._buf
+        end = 0
+        frames = []
+        for match in COMMAND_RE.finditer(buf):
+            frames.append(match.group(1))
+            end = match.end()
+        # keep the start of a partial message, anything else is garbage
+        start = buf.find(b"(", end)
+        del buf[: len(buf) if start == -1 else start]
+        return (frame.decode("utf-8") for frame in frames)
+
+
 class SensemeEndpoint:
     """High-level endpoint for SenseME protocol."""
 
     def __init__(self):
         """Initialize Senseme Discovery Endpoint."""
-        self.receive_queue = asyncio.Queue()
+        self.receive_queue = asyncio.Queue(RECEIVE_QUEUE_SIZE)
         self.opened = False
         self.transport = None
+        self._waiter: asyncio.Future | None = None
+        self._loop = asyncio.get_running_loop()
+        self._send_buffer: list[bytes] = []
 
     def abort(self) -> None:
         """Close the transport immediately. Buffered write data will be flushed."""
@@ -110,8 +225,12 @@ class SensemeEndpoint:
         """Close the transport gracefully. Buffered write data will be sent."""
         if self.transport is None:
             return
-        self.receive_queue.put_nowait(None)  # tell receive() socket is closed
+        try:
+            self.put(None)  # tell receive() socket is closed
+        except asyncio.QueueFull:
+            pass  # receive() sees the closing transport once the queue drains
         if self.transport:
+            self._flush_sends()
             self.transport.close()
 
     def is_closing(self) -> bool:
@@ -122,23 +241,63 @@ class SensemeEndpoint:
             return True  # opened connection but no transport is closed
         return self.transport.is_closing()
 
-    async def receive(self) -> str | None:
-        """Wait for a message from the SenseME fan.
+    async def receive(self) -> bytes | None:
+        """Wait for data from the SenseME fan.
 
+        Everything received so far is returned at once.
         Return None when the socket is closed.
         This method is a coroutine.
         """
         if not self.transport:
             return None
-        if self.receive_queue.empty() and self.transport.is_closing():
-            return None
-        return await self.receive_queue.get()
+        if self.receive_queue.empty():
+            if self.transport.is_closing():
+                return None
+            # wait for put() to hand over the data directly
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                data = await self._waiter
+            finally:
+                self._waiter = None
+        else:
+            data = self.receive_queue.get_nowait()
+        if data is None or self.receive_queue.empty():
+            return data
+        chunks = [data]
+        while not self.receive_queue.empty():
+            data = self.receive_queue.get_nowait()
+            if data is None:
+                break  # next receive() will see the closed transport
+            chunks.append(data)
+        return b"".join(chunks)
+
+    def put(self, data: bytes | None) -> None:
+        """Pass received data to receive(), None means the socket is closed."""
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            self._waiter = None
+            waiter.set_result(data)
+            return
+        self.receive_queue.put_nowait(data)
 
-    def send(self, cmd: str) -> None:
-        """Send a command to the SenseME fan."""
+    def send(self, cmd: bytes) -> None:
+        """Send an encoded command to the SenseME fan.
+
+        Commands sent during the same event loop iteration are written together.
+        """
         if self.transport is None:
             return
-        self.transport.write(cmd.encode("utf-8"))
+        if not self._send_buffer:
+            self._loop.call_soon(self._flush_sends)
+        self._send_buffer.append(cmd)
+
+    def _flush_sends(self) -> None:
+        """Write all buffered commands to the transport at once."""
+        if not self._send_buffer:
+            return
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.writelines(self._send_buffer)
+        self._send_buffer.clear()
 
 
 class SensemeProtocol(asyncio.Protocol):
@@ -153,9 +312,23 @@ class SensemeProtocol(asyncio.Protocol):
     def connection_made(self, transport: asyncio.BaseTransport) -> None:
         """Socket connect on SenseME Protocol."""
         _LOGGER.debug("%s: Connected", self._name)
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            self._enable_keepalive(sock)
         self._endpoint.transport = transport
         self._endpoint.opened = True
 
+    def _enable_keepalive(self, sock: socket.socket) -> None:
+        """Let the OS detect devices that disappeared without closing the socket."""
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            for option, value in KEEPALIVE_OPTIONS:
+                # not every platform supports tuning the keepalive timing
+                if hasattr(socket, option):
+                    sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+        except OSError:
+            _LOGGER.debug("%s: Unable to enable keepalive", self._name, exc_info=True)
+
     def connection_lost(self, exc):  # pylint: disable=unused-argument
         """Lost connection SenseME Protocol."""
         _LOGGER.debug("%s: Connection lost", self._name)
@@ -165,11 +338,12 @@ class SensemeProtocol(asyncio.Protocol):
     def data_received(self, data: bytes) -> None:
         """UDP packet received on SenseME Protocol."""
         if data:
-            msg = data.decode("utf-8")
             try:
-                self._endpoint.receive_queue.put_nowait(msg)
+                self._endpoint.put(data)
             except asyncio.QueueFull:
+                # frames have been lost, reconnect to get a consistent state
                 _LOGGER.error("%s: Receive queue full", self._name)
+                self._endpoint.abort()
 
     def eof_received(self) -> bool:
         """EOF received on SenseME Protocol."""
@@ -194,17 +368,17 @@ class SensemeDevice:
         if info is not None:
             self._name = info.get("name", None)
             self._uuid = info.get("uuid", None)
-            self._mac = info.get("mac", None)
+            self._set_mac(info.get("mac", None))
             self._address = info.get("address", None)
-            self._base_model = info.get("base_model", None)
+            self._set_base_model(info.get("base_model", None))
             self._has_light = info.get("has_light", None)
             self._has_sensor = info.get("has_sensor", None)
         else:
             self._name = name
             self._uuid = uuid
-            self._mac = mac
+            self._set_mac(mac)
             self._address = address
-            self._base_model = base_model
+            self._set_base_model(base_model)
             self._has_light = None
             if base_model is not None:
                 if self.model in ["Haiku Fan", "Haiku Light"]:
@@ -218,26 +392,30 @@ class SensemeDevice:
         self._room_name: str | None = None
         self._room_type: int | None = None
         self._fw_name = "Unknown"
+        self._fw_version_key = f"FW;{self._fw_name}"
         self._fw_version: str | None = None
 
         self._data: dict[str, Any] = dict()
+        self._parsed: dict[str, Any] = dict()
         self._is_running = False
         self._is_connected = asyncio.Event()
         self._connection_lost = False
+        self._loop: asyncio.AbstractEventLoop | None = None
         self._endpoint = None
         self._listener_task = None
         self._updater_task = None
         self._error_count = 0
-        self._leftover = ""
-        self._callbacks: list[Callable] = []
-        self._coroutine_callbacks: list[Coroutine] = []
+        self._connect_failures = 0
+        self._frame_parser = _FrameParser()
+        # maps each callback to whether it is a coroutine function
+        self._callbacks: dict[Callable, bool] = dict()
         self._first_update = asyncio.Event()
 
     def __eq__(self, other: Any) -> bool:
         """Equals magic method."""
         if isinstance(other, SensemeDevice):
-            if self._mac and other.mac:
-                return self._mac == other.mac
+            if self._mac and other._mac:
+                return self._mac == other._mac
         if isinstance(other, str):
             return other == self._name
 
@@ -321,16 +499,12 @@ class SensemeDevice:
 
         If the model is unknown then the default response is a "FAN".
         """
-        if self._base_model is None:
-            return "FAN"
-        return DEVICE_TYPES.get(self._base_model.upper(), "FAN")
+        return self._device_type
 
     @property
     def model(self) -> str | None:
         """Return Model of device."""
-        if self._base_model is None:
-            return None
-        return DEVICE_MODELS.get(self._base_model.upper(), self._base_model.upper())
+        return self._model
 
     @property
     def base_model(self) -> str | None:
@@ -340,18 +514,33 @@ class SensemeDevice:
     @classmethod
     def models(cls) -> list:
         """Return list of possible model names."""
-        no_duplicates = []
-        for model_name in DEVICE_MODELS.values():
-            if model_name not in no_duplicates:
-                no_duplicates.append(model_name)
-        return no_duplicates
+        return list(MODEL_NAMES)
 
     @property
     def is_unknown_model(self) -> bool:
         """Return True if the model is unknown."""
-        if self._base_model is None:
-            return True
-        return DEVICE_MODELS.get(self._base_model.upper(), None) is None
+        return self._is_unknown_model
+
+    def _set_mac(self, mac: str | None) -> None:
+        """Set the MAC address and the commands addressed to it."""
+        self._mac = mac
+        self._cmd_prefix = f"<{mac};".encode("utf-8")
+        self._update_payload = b"".join(
+            self._cmd_prefix + _encode_command(cmd) for cmd in UPDATE_COMMANDS
+        )
+
+    def _set_base_model(self, base_model: str | None) -> None:
+        """Set the model as reported and the values derived from it."""
+        self._base_model = base_model
+        if base_model is None:
+            self._model: str | None = None
+            self._device_type = "FAN"
+            self._is_unknown_model = True
+            return
+        upper_model = base_model.upper()
+        self._model = DEVICE_MODELS.get(upper_model, upper_model)
+        self._device_type = DEVICE_TYPES.get(upper_model, "FAN")
+        self._is_unknown_model = upper_model not in DEVICE_MODELS
 
     @property
     def fw_version(self) -> str | None:
@@ -371,52 +560,32 @@ class SensemeDevice:
     @property
     def device_indicators(self) -> str | None:
         """Return True if the device LED indicator is enabled."""
-        value = self._data.get("DEVICE;INDICATORS", None)
-        if value:
-            return value == "ON"
-        return None
+        return self._get_parsed("DEVICE;INDICATORS", _parse_on)
 
     @device_indicators.setter
     def device_indicators(self, value: bool):
         """Enable/disable the device LED indicator."""
-        if value:
-            state = "ON"
-        else:
-            state = "OFF"
-        self._send_command(f"DEVICE;INDICATORS;{state}")
+        self._send_encoded_command(INDICATORS_COMMANDS[bool(value)])
 
     @property
     def device_beeper(self) -> bool | None:
         """Return the device audible alert enabled state."""
-        status = self._data.get("DEVICE;BEEPER", None)
-        if status:
-            return status == "ON"
-        return None
+        return self._get_parsed("DEVICE;BEEPER", _parse_on)
 
     @device_beeper.setter
     def device_beeper(self, value: bool) -> None:
         """Enable/disable the device audible alert."""
-        if value:
-            state = "ON"
-        else:
-            state = "OFF"
-        self._send_command(f"DEVICE;BEEPER;{state}")
+        self._send_encoded_command(BEEPER_COMMANDS[bool(value)])
 
     @property
     def network_ap_on(self) -> bool | None:
         """Return the wireless access point running state."""
-        status = self._data.get("NW;AP;STATUS", None)
-        if status:
-            return status == "ON"
-        return None
+        return self._get_parsed("NW;AP;STATUS", _parse_on)
 
     @property
     def network_dhcp_on(self) -> bool | None:
         """Return the device local DHCP service running state."""
-        dhcp = self._data.get("NW;DHCP", None)
-        if dhcp:
-            return dhcp == "ON"
-        return None
+        return self._get_parsed("NW;DHCP", _parse_on)
 
     @property
     def network_ip(self) -> str | None:
@@ -425,27 +594,24 @@ class SensemeDevice:
         This IP address is reported by the SenseME device and not necessarily the same IP
         address used to connect with the device.
         """
-        addresses = self._data.get("NW;PARAMS;ACTUAL", None)
+        addresses = self._get_parsed("NW;PARAMS;ACTUAL", _split_values)
         if addresses:
-            addresses = addresses.split(";")
             return addresses[0]
         return None
 
     @property
     def network_subnetmask(self) -> str | None:
         """Return the network gateway address of the device."""
-        addresses = self._data.get("NW;PARAMS;ACTUAL", None)
+        addresses = self._get_parsed("NW;PARAMS;ACTUAL", _split_values)
         if addresses:
-            addresses = addresses.split(";")
             return addresses[2]
         return None
 
     @property
     def network_gateway(self) -> str | None:
         """Return the network gateway address of the device."""
-        addresses = self._data.get("NW;PARAMS;ACTUAL", None)
+        addresses = self._get_parsed("NW;PARAMS;ACTUAL", _split_values)
         if addresses:
-            addresses = addresses.split(";")
             return addresses[1]
         return None
 
@@ -487,24 +653,17 @@ class SensemeDevice:
     @property
     def light_on(self) -> bool | None:
         """Return True when light is on at any brightness."""
-        state = self._data.get("LIGHT;PWR", None)
-        if state:
-            return state == "ON"
-        return None
+        return self._get_parsed("LIGHT;PWR", _parse_on)
 
     @light_on.setter
     def light_on(self, state: bool) -> None:
         """Set the light power state."""
-        value = "ON" if state else "OFF"
-        self._send_command(f"LIGHT;PWR;{value}")
+        self._send_encoded_command(LIGHT_POWER_COMMANDS[bool(state)])
 
     @property
     def light_brightness(self) -> int | None:
         """Return the light brightness."""
-        level = self._data.get("LIGHT;LEVEL;ACTUAL", None)
-        if level:
-            return int(level)
-        return None
+        return self._get_parsed("LIGHT;LEVEL;ACTUAL", int)
 
     @light_brightness.setter
     def light_brightness(self, level: int) -> None:
@@ -518,18 +677,12 @@ class SensemeDevice:
     @property
     def light_brightness_min(self) -> int | None:
         """Return the light brightness minimum."""
-        min_brightness = self._data.get("LIGHT;LEVEL;MIN", None)
-        if min_brightness:
-            return int(min_brightness)
-        return None
+        return self._get_parsed("LIGHT;LEVEL;MIN", int)
 
     @property
     def light_brightness_max(self) -> int | None:
         """Return the light brightness maximum."""
-        max_brightness = self._data.get("LIGHT;LEVEL;MAX", None)
-        if max_brightness:
-            return int(max_brightness)
-        return None
+        return self._get_parsed("LIGHT;LEVEL;MAX", int)
 
     @property
     def light_brightness_limits_room(self) -> tuple | None:
@@ -540,15 +693,7 @@ class SensemeDevice:
         can be found by clicking the room info button. You have to have at least one
         fan with installed light added to a room.
         """
-        raw = self._data.get("LIGHT;BOOKENDS", None)
-        if raw is None:
-            return None
-        values = raw.split(";")
-        if len(values) != 2:
-            return None
-        min_bright = int(values[0])
-        max_bright = int(values[1])
-        return min_bright, max_bright
+        return self._get_parsed("LIGHT;BOOKENDS", _parse_bookends)
 
     @property
     def motion_detected(self) -> bool | None:
@@ -556,52 +701,44 @@ class SensemeDevice:
 
         Available on all SenseME fans.
         """
-        status = self._data.get("SNSROCC;STATUS", None)
-        if status:
-            return status == "OCCUPIED"
-        return None
+        return self._get_parsed("SNSROCC;STATUS", _parse_occupied)
 
     @property
     def motion_light_auto(self) -> bool | None:
         """Return True when light is in automatic on with motion mode."""
         if not self.has_light:
             return None
-        state = self._data.get("LIGHT;AUTO", None)
-        if state:
-            return state == "ON"
-        return None
+        return self._get_parsed("LIGHT;AUTO", _parse_on)
 
     @motion_light_auto.setter
     def motion_light_auto(self, state: bool) -> None:
         """Set the light automatic on with motion mode."""
         if not self.has_light:
             return
-        converted_state = "ON" if state else "OFF"
-        self._send_command(f"LIGHT;AUTO;{converted_state}")
+        self._send_encoded_command(LIGHT_AUTO_COMMANDS[bool(state)])
 
     @property
     def sleep_mode(self) -> bool | None:
         """Return True when sleep mode is enabled."""
-        state = self._data.get("SLEEP;STATE", None)
-        if state:
-            return state == "ON"
-        return None
+        return self._get_parsed("SLEEP;STATE", _parse_on)
 
     @sleep_mode.setter
     def sleep_mode(self, state: bool) -> None:
         """Set the sleep mode."""
-        converted_state = "ON" if state else "OFF"
-        self._send_command(f"SLEEP;STATE;{converted_state}")
+        self._send_encoded_command(SLEEP_COMMANDS[bool(state)])
 
     async def async_fill_out_info(self) -> bool:
         """Retrieve info from the SenseME device directly.
 
         Does not start background tasks to retrieve device/parameter information.
+        A device that is already running is queried over its existing connection.
         This method is a coroutine.
         """
         writer = None
         if self.is_sec_info_complete:
             return True
+        if self._is_running:
+            return await self.async_update()
         try:
             _LOGGER.debug(
                 "Retrieve device information: Connecting to address %s", self.address
@@ -611,16 +748,25 @@ class SensemeDevice:
                 "Retrieve device information: Status Update from address %s",
                 self.address,
             )
-            writer.write(f"<{self._address};DEVICE;ID;GET>".encode())
-            writer.write(f"<{self._address};SNSROCC;STATUS;GET>".encode())
-            writer.write(f"<{self._address};GETALL;GET>".encode())
+            writer.write(
+                f"<{self._address};DEVICE;ID;GET>"
+                f"<{self._address};SNSROCC;STATUS;GET>"
+                f"<{self._address};GETALL;GET>".encode()
+            )
 
-            leftover = ""
+            parser = _FrameParser()
             while True:
                 # socket will throw a timeout error and abort this function if
                 # no proper response is received
-                line = await asyncio.wait_for(reader.readuntil(b")"), 10)
-                leftover, _ = self._process_message(leftover + line.decode("utf-8"))
+                data = await asyncio.wait_for(reader.read(4096), 10)
+                if not data:
+                    _LOGGER.debug(
+                        "Retrieve device information: Connection closed by address %s",
+                        self.address,
+                    )
+                    return False
+                parser.feed(data)
+                self._process_message(parser.iter_frames())
                 if self._first_update.is_set():
                     return True
         except asyncio.TimeoutError:
@@ -631,9 +777,9 @@ class SensemeDevice:
             return False
         except OSError:
             _LOGGER.debug(
-                "%s: Retrieve device information: Error\n%s",
+                "%s: Retrieve device information: Error",
                 self.address,
-                traceback.format_exc(),
+                exc_info=True,
             )
             return False
         finally:
@@ -644,109 +790,133 @@ class SensemeDevice:
                     self.address,
                 )
                 writer.close()
-                await writer.wait_closed()
+                try:
+                    await writer.wait_closed()
+                except OSError:
+                    # the result is already known, a reset on close changes nothing
+                    pass
 
     def add_callback(self, callback: Callable) -> None:
         """Add callback function/coroutine. Called when parameters are updated."""
         is_coroutine = inspect.iscoroutinefunction(callback)
+        self._callbacks.setdefault(callback, is_coroutine)
         if is_coroutine:
-            if callback not in self._coroutine_callbacks:
-                self._coroutine_callbacks.append(callback)  # type: ignore
             _LOGGER.debug("%s: Added coroutine callback", self.name)
-            return
-
-        if callback not in self._callbacks:
-            self._callbacks.append(callback)  # type: ignore
-        _LOGGER.debug("%s: Added function callback", self.name)
+        else:
+            _LOGGER.debug("%s: Added function callback", self.name)
 
     def remove_callback(self, callback) -> None:
         """Remove existing callback function/coroutine."""
-        if callback in self._coroutine_callbacks:
-            self._coroutine_callbacks.remove(callback)
+        is_coroutine = self._callbacks.pop(callback, None)
+        if is_coroutine:
             _LOGGER.debug("%s: Removed coroutine callback", self.name)
-            return
-        if callback in self._callbacks:
-            self._callbacks.remove(callback)
+        elif is_coroutine is not None:
             _LOGGER.debug("%s: Removed function callback", self.name)
-            return
 
     async def async_update(self, connection_lost=False, timeout_seconds=10) -> bool:
         """Wait for first update of all parameters in SenseME device.
 
         If connection_lost is True this connect will be treated as a reconnect.
         If timeout_seconds is how long this method will wait for a response
-        before timing out. The Device will be started if not already.
+        before timing out. The Device will be started if not already. A Device
+        started by this call is stopped again when it times out.
         This method is a coroutine.
         """
         if connection_lost:
             self._connection_lost = True
-        if not self._is_running:
+        started = not self._is_running
+        if started:
             self.start()
+        if self.available:
+            return True
+
+        async def _async_wait_available() -> None:
+            await self._is_connected.wait()
+            await self._first_update.wait()
+
         try:
-            await asyncio.wait(
-                [self._first_update.wait(), self._is_connected.wait()],
-                timeout=timeout_seconds,
-            )
+            await asyncio.wait_for(_async_wait_available(), timeout_seconds)
         except asyncio.TimeoutError:
+            if started:
+                self.stop()
             return False
         return True
 
     def _execute_callbacks(self) -> None:
         """Run all callbacks to indicate something has changed."""
-        count = 0
-        for callback in self._callbacks:
-            count += 1
-            callback()
-        for coro in self._coroutine_callbacks:
-            count += 1
-            asyncio.create_task(coro())  # type: ignore
-        _LOGGER.debug("%s: %s callback(s) happened.", self.name, count)
-
-    def _send_command(self, cmd) -> None:
+        # iterate over a snapshot so callbacks may remove themselves
+        callbacks = tuple(self._callbacks.items())
+        for callback, is_coroutine in callbacks:
+            if is_coroutine:
+                self._loop.create_task(callback())  # type: ignore
+            else:
+                callback()
+        _LOGGER.debug("%s: %s callback(s) happened.", self.name, len(callbacks))
+
+    def _get_parsed(self, key: str, parser: Callable[[str], Any]) -> Any:
+        """Return a parameter converted by parser.
+
+        The result is cached until the parameter changes.
+        """
+        try:
+            return self._parsed[key]
+        except KeyError:
+            pass
+        raw = self._data.get(key, None)
+        value = parser(raw) if raw else None
+        self._parsed[key] = value
+        return value
+
+    def _send_command(self, cmd: str) -> None:
         """Send a command to SenseME device."""
+        self._send_encoded_command(_encode_command(cmd))
+
+    def _send_encoded_command(self, cmd: bytes) -> None:
+        """Send a command encoded by _encode_command() to SenseME device."""
         if self._endpoint is None:
             return
-        msg = f"<{self.mac};{cmd}>"
-        self._endpoint.send(msg)
+        self._endpoint.send(self._cmd_prefix + cmd)
 
-    def _process_message(self, line: str) -> tuple[str, bool]:
+    def _process_message(self, frames: Iterable[str]) -> bool:
         """Process messages from device.
 
-        May contain multiple responses in one line string.
-        Last response may be a partial so it is returned.
-        This partial should be added to next line.
+        Returns True when callbacks should be executed.
         """
         try:
-            return self._process_message_inner(line)
+            return self._process_message_inner(frames)
         except Exception:  # pylint: disable=broad-except:
             _LOGGER.warning("Error processing message", exc_info=True)
-            return "", False
+            return False
 
-    def _process_message_inner(self, line: str) -> tuple[str, bool]:  # noqa: C901
+    def _process_message_inner(self, frames: Iterable[str]) -> bool:  # noqa: C901
         should_callback = False
-        # The line received may have multiple parenthesized responses
-        # Split them and process each individual message.
-        for msg in COMMAND_RE.findall(line):
-            # remove begining '(' and ending ')' from string
-            # also extract name if undefined
-            name, result = msg[1:-1].split(";", 1)
+        # these objects are only replaced between batches of messages
+        data = self._data
+        parsed = self._parsed
+        first_update = self._first_update
+        # Process each individual parenthesized message.
+        for msg in frames:
+            # extract name if undefined
+            name, result = msg.split(";", 1)
             if self._name is None:
-                self._data["NAME;VALUE"] = name
+                data["NAME;VALUE"] = name
                 self._name = name
             # most messages have only one value at the end
             valuecount = 1
-            if "BOOKENDS" in result:
-                valuecount = 2
-            elif "NW;PARAMS;ACTUAL" in result:
-                valuecount = 3
-            elif "DEVICE;LIGHT" in result:
-                valuecount = len(result.split(";")) - 2
-            elif "DEVICE;ID" in result:
-                valuecount = 2
+            if result.startswith(MULTI_VALUE_PREFIXES):
+                if result.startswith("DEVICE;LIGHT"):
+                    valuecount = len(result.split(";")) - 2
+                else:
+                    for prefix, count in MULTI_VALUE_PARAMS.items():
+                        if result.startswith(prefix):
+                            valuecount = count
+                            break
             # split on ';' and the associate the correct number of values
-            values = result.split(";")
-            key = ";".join(values[:-valuecount])
-            value = ";".join(values[-valuecount:])
+            if valuecount == 1:
+                key, _, value = result.rpartition(";")
+            else:
+                key, *values = result.rsplit(";", valuecount)
+                value = ";".join(values)
             if key == "ERROR":
                 _LOGGER.error(
                     "%s: Command error response",
@@ -756,60 +926,92 @@ class SensemeDevice:
             if key == "TIME;VALUE":
                 # ignore time parameter
                 continue
-            if self._data.get(key, INVALID_DATA) == value:
+            if data.get(key, INVALID_DATA) == value:
                 # parameter has not changed, nothing to do
                 continue
-            self._data[key] = value  # update new key/value or changed value
+            data[key] = value  # update new key/value or changed value
+            parsed.pop(key, None)
             _LOGGER.debug("%s: Param updated: [%s]='%s'", self.name, key, value)
             if self.is_fan:
                 if key == "WINTERMODE;STATE":
-                    if not self._first_update.is_set():
-                        self._first_update.set()
+                    if not first_update.is_set():
+                        first_update.set()
                         _LOGGER.debug("%s: First Update Complete", self.name)
             else:
                 if key == "SNSROCC;TIMEOUT;MIN":
-                    if not self._first_update.is_set():
-                        self._first_update.set()
+                    if not first_update.is_set():
+                        first_update.set()
                         _LOGGER.debug("%s: First Update Complete", self.name)
-            if self._first_update.is_set() and key not in SUPPRESS_CALLBACK_PARAMS:
+            if first_update.is_set() and key not in SUPPRESS_CALLBACK_PARAMS:
                 should_callback = True
             # update certain local variables that are not part of data
-            if key == "FW;NAME":
-                self._fw_name = value
-            elif key == ("FW;" + self._fw_name):
+            handler = self._KEY_HANDLERS.get(key)
+            if handler is not None:
+                handler(self, value)
+            elif key == self._fw_version_key:
                 self._fw_version = value
-            elif key == "DEVICE;LIGHT":
-                if self._has_light is None:
-                    value = value.upper()
-                    self._has_light = value in ("PRESENT", "PRESENT;COLOR")
-            elif key == "NW;TOKEN":
-                self._uuid = value.lower()
-            elif key == "NAME;VALUE":
-                self._name = value
-            elif key == "GROUP;LIST":
-                self._room_name = value
-            elif key == "GROUP;ROOM;TYPE":
-                self._room_type = int(value)
-            elif key == "DEVICE;ID":
-                self._mac, self._base_model = value.split(";")
-                if self.model in ["Haiku Fan", "Haiku Light"]:
-                    self._has_sensor = True
-                elif self.model == "Haiku L Fan":
-                    # determined by "DEVICE;OPTION;SENSORS" below
-                    self._has_sensor = None
-                else:
-                    self._has_sensor = False
-            elif key == "DEVICE;OPTION;SENSORS":
-                if self._has_sensor is None:
-                    value = value.upper()
-                    self._has_sensor = value == "PRESENT"
-        return "", should_callback
+        return should_callback
+
+    def _handle_fw_name(self, value: str) -> None:
+        """Set firmware name, the firmware version is reported under it."""
+        self._fw_name = value
+        self._fw_version_key = f"FW;{value}"
+
+    def _handle_device_light(self, value: str) -> None:
+        """Set whether a light is installed."""
+        if self._has_light is None:
+            self._has_light = value.upper() in ("PRESENT", "PRESENT;COLOR")
+
+    def _handle_nw_token(self, value: str) -> None:
+        """Set UUID."""
+        self._uuid = value.lower()
+
+    def _handle_name(self, value: str) -> None:
+        """Set device name."""
+        self._name = value
+
+    def _handle_group_list(self, value: str) -> None:
+        """Set room name."""
+        self._room_name = value
+
+    def _handle_room_type(self, value: str) -> None:
+        """Set room type."""
+        self._room_type = int(value)
+
+    def _handle_device_id(self, value: str) -> None:
+        """Set MAC address and model, which determine sensor support."""
+        mac, base_model = value.split(";")
+        self._set_mac(mac)
+        self._set_base_model(base_model)
+        if self.model in ["Haiku Fan", "Haiku Light"]:
+            self._has_sensor = True
+        elif self.model == "Haiku L Fan":
+            # determined by "DEVICE;OPTION;SENSORS" below
+            self._has_sensor = None
+        else:
+            self._has_sensor = False
+
+    def _handle_sensors(self, value: str) -> None:
+        """Set whether a sensor is installed when the model does not tell."""
+        if self._has_sensor is None:
+            self._has_sensor = value.upper() == "PRESENT"
+
+    # parameters that update local variables that are not part of data
+    _KEY_HANDLERS: dict[str, Callable[[SensemeDevice, str], None]] = {
+        "FW;NAME": _handle_fw_name,
+        "DEVICE;LIGHT": _handle_device_light,
+        "NW;TOKEN": _handle_nw_token,
+        "NAME;VALUE": _handle_name,
+        "GROUP;LIST": _handle_group_list,
+        "GROUP;ROOM;TYPE": _handle_room_type,
+        "DEVICE;ID": _handle_device_id,
+        "DEVICE;OPTION;SENSORS": _handle_sensors,
+    }
 
     def _send_update(self):
         """Sends update commands to an already connected device."""
-        self._send_command("DEVICE;ID;GET")
-        self._send_command("SNSROCC;STATUS;GET")
-        self._send_command("GETALL")
+        if self._endpoint is not None:
+            self._endpoint.send(self._update_payload)
         _LOGGER.debug("%s: Status update", self.name)
 
     async def _updater(self):
@@ -825,15 +1027,13 @@ class SensemeDevice:
                 _LOGGER.debug("%s: Updater task cancelled", self.name)
                 return
             except OSError:
-                _LOGGER.debug(
-                    "%s: Updater task error\n%s", self.name, traceback.format_exc()
-                )
+                _LOGGER.debug("%s: Updater task error", self.name, exc_info=True)
                 await asyncio.sleep(self.refresh_minutes * 60 + random.uniform(-10, 10))
             except Exception:
                 _LOGGER.error(
-                    "%s: Unhandled updater task error\n%s",
+                    "%s: Unhandled updater task error",
                     self.name,
-                    traceback.format_exc(),
+                    exc_info=True,
                 )
                 await asyncio.sleep(10)
                 raise
@@ -845,6 +1045,7 @@ class SensemeDevice:
         Lost connections are automatically reconnected.
         This method is a coroutine.
         """
+        assert self._loop is not None
         while True:
             try:
                 if self._error_count > 10:
@@ -858,16 +1059,18 @@ class SensemeDevice:
                 if self._endpoint is None:
                     self._is_connected.clear()
                     self._endpoint = SensemeEndpoint()
+                    self._frame_parser = _FrameParser()
                     try:
                         _LOGGER.debug("%s: Connecting", self.name)
-                        await asyncio.get_running_loop().create_connection(
+                        await self._loop.create_connection(
                             lambda: SensemeProtocol(self._name, self._endpoint),
                             self._address,
                             PORT,
                         )
                         _LOGGER.debug("%s: Creating Updater Task", self.name)
-                        self._updater_task = asyncio.create_task(self._updater())
+                        self._updater_task = self._loop.create_task(self._updater())
                         self._error_count = 0
+                        self._connect_failures = 0
                         self._is_connected.set()
                         if self._connection_lost:
                             _LOGGER.warning(
@@ -883,13 +1086,21 @@ class SensemeDevice:
                                 self.address,
                             )
                     except OSError:
+                        # back off exponentially with jitter so devices that
+                        # lost power together do not all reconnect at once
+                        self._connect_failures += 1
+                        delay = min(
+                            MAX_CONNECT_RETRY_SECONDS, 2**self._connect_failures
+                        )
+                        delay += random.uniform(0, delay * 0.1)
                         _LOGGER.debug(
-                            "%s: Connect failed, try again in a minute\n%s",
+                            "%s: Connect failed, try again in %.1f seconds",
                             self.name,
-                            traceback.format_exc(),
+                            delay,
+                            exc_info=True,
                         )
                         self._endpoint = None
-                        await asyncio.sleep(60)
+                        await asyncio.sleep(delay)
                         continue
                 try:
                     data = await asyncio.wait_for(
@@ -906,6 +1117,7 @@ class SensemeDevice:
                         "%s: Connection to address %s lost", self.name, self.address
                     )
                     self._data = dict()
+                    self._parsed = dict()
                     self._is_connected.clear()
                     self._first_update.clear()
                     self._connection_lost = True
@@ -914,25 +1126,27 @@ class SensemeDevice:
                     self._updater_task.cancel()
                     await asyncio.sleep(1)
                     continue
-                # add previous partial data to new data and process
-                self._leftover, should_callback = self._process_message(
-                    self._leftover + data
+                # partial data is kept by the parser until the rest arrives
+                self._frame_parser.feed(data)
+                should_callback = self._process_message(
+                    self._frame_parser.iter_frames()
                 )
+                # a parsed batch means the connection works, restart the backoff
+                self._error_count = 0
                 if should_callback:
                     self._execute_callbacks()
             except asyncio.CancelledError:
                 _LOGGER.debug("%s: Listener task cancelled", self.name)
                 return
             except OSError:
-                _LOGGER.debug(
-                    "%s: Listener task\n%s", self.name, traceback.format_exc()
-                )
+                _LOGGER.debug("%s: Listener task", self.name, exc_info=True)
                 self._error_count += 1
-                await asyncio.sleep(1)
-            except Exception:
-                _LOGGER.error(
-                    "%s: Listener task error\n%s", self.name, traceback.format_exc()
+                # back off so repeated fast failures are not retried every second
+                await asyncio.sleep(
+                    min(2 ** (self._error_count - 1), MAX_ERROR_RETRY_SECONDS)
                 )
+            except Exception:
+                _LOGGER.error("%s: Listener task error", self.name, exc_info=True)
                 _LOGGER.error(
                     "%s: Listener task will now stop due to unexpected error", self.name
                 )
@@ -942,7 +1156,8 @@ class SensemeDevice:
     def start(self):
         """Start the async task to handle responses from the device."""
         if not self._is_running:
-            self._listener_task = asyncio.create_task(self._listener())
+            self._loop = asyncio.get_running_loop()
+            self._listener_task = self._loop.create_task(self._listener())
             self._is_running = True
             _LOGGER.debug("%s: Started", self.name)
 
@@ -987,24 +1202,17 @@ class SensemeFan(SensemeDevice):
     @property
     def fan_on(self) -> bool | None:
         """Return True when fan is on at any speed."""
-        state = self._data.get("FAN;PWR", None)
-        if state:
-            return state == "ON"
-        return None
+        return self._get_parsed("FAN;PWR", _parse_on)
 
     @fan_on.setter
     def fan_on(self, state: bool) -> None:
         """Set the fan power state."""
-        converted_state = "ON" if state else "OFF"
-        self._send_command(f"FAN;PWR;{converted_state}")
+        self._send_encoded_command(FAN_POWER_COMMANDS[bool(state)])
 
     @property
     def fan_speed(self) -> int | None:
         """Return the fan speed."""
-        speed = self._data.get("FAN;SPD;ACTUAL", None)
-        if speed:
-            return int(speed)
-        return None
+        return self._get_parsed("FAN;SPD;ACTUAL", int)
 
     @fan_speed.setter
     def fan_speed(self, speed: int) -> None:
@@ -1014,18 +1222,12 @@ class SensemeFan(SensemeDevice):
     @property
     def fan_speed_min(self) -> int | None:
         """Return the fan speed minimum."""
-        min_speed = self._data.get("FAN;SPD;MIN", None)
-        if min_speed:
-            return int(min_speed)
-        return None
+        return self._get_parsed("FAN;SPD;MIN", int)
 
     @property
     def fan_speed_max(self) -> int | None:
         """Return the fan speed maximum."""
-        max_speed = self._data.get("FAN;SPD;MAX", None)
-        if max_speed:
-            return int(max_speed)
-        return None
+        return self._get_parsed("FAN;SPD;MAX", int)
 
     @property
     def fan_speed_limits(self) -> tuple[int | None, int | None]:
@@ -1040,15 +1242,7 @@ class SensemeFan(SensemeDevice):
         speed settings. On the Haiku by BAF application this setting can be found by
         clicking the room info button. There must be at least one fan added to a room.
         """
-        raw = self._data.get("FAN;BOOKENDS", None)
-        if raw is None:
-            return None
-        values = raw.split(";")
-        if len(values) != 2:
-            return None
-        min_speed = int(values[0])
-        max_speed = int(values[1])
-        return min_speed, max_speed
+        return self._get_parsed("FAN;BOOKENDS", _parse_bookends)
 
     @fan_speed_limits_room.setter
     def fan_speed_limits_room(self, speeds: tuple) -> None:
@@ -1070,21 +1264,17 @@ class SensemeFan(SensemeDevice):
             raise ValueError(
                 f"{direction} is not a valid direction. Must be one of {DIRECTIONS}"
             )
-        self._send_command(f"FAN;DIR;SET;{direction}")
+        self._send_encoded_command(FAN_DIR_COMMANDS[direction])
 
     @property
     def fan_whoosh_mode(self) -> bool | None:
         """Return True when fan whoosh mode is on."""
-        state = self._data.get("FAN;WHOOSH;STATUS", None)
-        if state:
-            return state == "ON"
-        return None
+        return self._get_parsed("FAN;WHOOSH;STATUS", _parse_on)
 
     @fan_whoosh_mode.setter
     def fan_whoosh_mode(self, state: bool) -> None:
         """Set the fan whoosh mode."""
-        value = "ON" if state else "OFF"
-        self._send_command(f"FAN;WHOOSH;{value}")
+        self._send_encoded_command(FAN_WHOOSH_COMMANDS[bool(state)])
 
     @property
     def fan_autocomfort(self) -> str | None:
@@ -1108,8 +1298,7 @@ class SensemeFan(SensemeDevice):
         while room is not occupied.
         'FOLLOWTSTAT' means change between 'COOLING' and 'HEATING based on thermostat.
         """
-        value = "ON" if state else "OFF"
-        self._send_command(f"SMARTMODE;STATE;SET;{value}")
+        self._send_encoded_command(AUTOCOMFORT_COMMANDS[bool(state)])
 
     @property
     def fan_smartmode(self) -> str | None:
@@ -1134,15 +1323,12 @@ class SensemeFan(SensemeDevice):
         """
         if mode not in AUTOCOMFORTS:
             raise ValueError(f"Mode '{mode}' not supported")
-        self._send_command(f"SMARTMODE;STATE;SET;{mode}")
+        self._send_encoded_command(SMARTMODE_COMMANDS[mode])
 
     @property
     def fan_cooltemp(self) -> float | None:
         """Return the auto shutoff temperature for 'COOLING' smart mode in Celsius."""
-        temp = int(self._data.get("LEARN;ZEROTEMP", None))
-        if temp:
-            return float(temp) / 100.0
-        return None
+        return self._get_parsed("LEARN;ZEROTEMP", _parse_temperature)
 
     @fan_cooltemp.setter
     def fan_cooltemp(self, temp: float) -> None:
@@ -1158,7 +1344,7 @@ class SensemeFan(SensemeDevice):
     @property
     def fan_coolminspeed(self) -> int | None:
         """Return the min speed of smart cooling mode"""
-        return int(self._data.get("LEARN;MINSPEED", None))
+        return self._get_parsed("LEARN;MINSPEED", int)
 
     @fan_coolminspeed.setter
     def fan_coolminspeed(self, speed: int) -> None:
@@ -1168,7 +1354,7 @@ class SensemeFan(SensemeDevice):
     @property
     def fan_coolmaxspeed(self) -> int | None:
         """Return the max speed of smart cooling mode"""
-        return int(self._data.get("LEARN;MAXSPEED", None))
+        return self._get_parsed("LEARN;MAXSPEED", int)
 
     @fan_coolmaxspeed.setter
     def fan_coolmaxspeed(self, speed: int) -> None:
@@ -1178,16 +1364,12 @@ class SensemeFan(SensemeDevice):
     @property
     def motion_fan_auto(self) -> bool | None:
         """Return True when fan is in automatic on with motion mode."""
-        state = self._data.get("FAN;AUTO", None)
-        if state:
-            return state == "ON"
-        return None
+        return self._get_parsed("FAN;AUTO", _parse_on)
 
     @motion_fan_auto.setter
     def motion_fan_auto(self, state: bool) -> None:
         """Set the fan automatic on with motion mode."""
-        converted_state = "ON" if state else "OFF"
-        self._send_command(f"FAN;AUTO;{converted_state}")
+        self._send_encoded_command(FAN_AUTO_COMMANDS[bool(state)])
 
 
 class SensemeLight(SensemeDevice):
@@ -1219,39 +1401,26 @@ class SensemeLight(SensemeDevice):
     @property
     def light_color_temp(self) -> int | None:
         """Return the light color temperature."""
-        color_temp = self._data.get("LIGHT;COLOR;TEMP;VALUE", None)
-        if color_temp:
-            return int(color_temp)
-        return None
+        return self._get_parsed("LIGHT;COLOR;TEMP;VALUE", int)
 
     @light_color_temp.setter
     def light_color_temp(self, color_temp: int) -> None:
         """Set the light color temperature."""
-        if (
-            self.light_color_temp_min is not None
-            and color_temp < self.light_color_temp_min
-        ):
-            color_temp = self.light_color_temp_min
-        if (
-            self.light_color_temp_max is not None
-            and color_temp > self.light_color_temp_max
-        ):
-            color_temp = self.light_color_temp_max
+        min_color_temp = self.light_color_temp_min
+        if min_color_temp is not None and color_temp < min_color_temp:
+            color_temp = min_color_temp
+        max_color_temp = self.light_color_temp_max
+        if max_color_temp is not None and color_temp > max_color_temp:
+            color_temp = max_color_temp
         color_temp = int(round(color_temp / 100.0)) * 100
         self._send_command(f"LIGHT;COLOR;TEMP;VALUE;SET;{color_temp}")
 
     @property
     def light_color_temp_min(self) -> int | None:
         """Return the light color temperature minimum (warmest light)."""
-        min_color_temp = self._data.get("LIGHT;COLOR;TEMP;MIN", None)
-        if min_color_temp:
-            return int(min_color_temp)
-        return None
+        return self._get_parsed("LIGHT;COLOR;TEMP;MIN", int)
 
     @property
     def light_color_temp_max(self) -> int | None:
         """Return the light color temperature maximum (coolest light)."""
-        max_color_temp = self._data.get("LIGHT;COLOR;TEMP;MAX", None)
-        if max_color_temp:
-            return int(max_color_temp)
-        return None
+        return self._get_parsed("LIGHT;COLOR;TEMP;MAX", int)
@@ -18,10 +18,11 @@ import inspect
 import ipaddress
 import logging
 import random
+import re
 import socket
 import sys
 import time
-import traceback
+from functools import partial
 from typing import Callable
 
 import ifaddr  # type: ignore
@@ -31,24 +32,89 @@ from .device import DEVICE_TYPES, IGNORE_MODELS, SensemeDevice, SensemeFan, Sens
 _LOGGER = logging.getLogger(__name__)
 
 PORT = 31415
+BROADCAST_ADDRESS = ("<broadcast>", PORT)
+BROADCAST_PAYLOAD = b"<ALL;DEVICE;ID;GET>"
+RECEIVE_QUEUE_SIZE = 256  # responses waiting to be processed
+
+# how long the list of local IPv4 addresses is reused
+ADDRESSES_CACHE_SECONDS = 60.0
+_addresses_cache: tuple[float, list[str]] | None = None
+
+DEVICE_CLASSES: dict[str, type[SensemeFan] | type[SensemeLight]] = {
+    "FAN": SensemeFan,
+    "LIGHT": SensemeLight,
+}
+DEVICE_CLASS_BY_MODEL = {
+    model: DEVICE_CLASSES[device_type] for model, device_type in DEVICE_TYPES.items()
+}
+
+# (name;DEVICE;ID;mac;model) sent in response to the discovery broadcast
+DISCOVERY_RE = re.compile(rb"\(([^;]*);[^;]*;[^;]*;([^;]*);([^;]*)\)")
 
 # the default windows event loop (ProactorEventLoop) does not support
 # create_datagram_endpoint() needed by this module. Switching to the
 # SelectorEventLoop fixes this problem but may have unintended consequences.
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    asyncio.get_event_loop()  # start the loop
     _LOGGER.debug("Changing event loop for Windows")
 
+# errno values meaning the address cannot be used for broadcasts
+ERRNO_EINVAL = {errno.EINVAL}
+if sys.platform == "win32":
+    ERRNO_EINVAL.add(errno.WSAEINVAL)
+
+
+def _get_ipv4_addresses() -> list[str]:
+    """Return the non-loopback IPv4 addresses of this host.
+
+    Enumerating the network adapters is expensive so the result is cached
+    for ADDRESSES_CACHE_SECONDS.
+    """
+    global _addresses_cache
+    now = time.monotonic()
+    if _addresses_cache is not None:
+        timestamp, addresses = _addresses_cache
+        if now - timestamp < ADDRESSES_CACHE_SECONDS:
+            return addresses
+    addresses = [
+        ip.ip
+        for adapter in ifaddr.get_adapters()
+        for ip in adapter.ips
+        # IPv4 addresses are str, IPv6 addresses are tuples
+        if isinstance(ip.ip, str) and not ipaddress.ip_address(ip.ip).is_loopback
+    ]
+    _addresses_cache = (now, addresses)
+    return addresses
+
+
+def _clear_ipv4_addresses() -> None:
+    """Forget the cached IPv4 addresses so they are enumerated again."""
+    global _addresses_cache
+    _addresses_cache = None
+
+
+def _device_key(device: SensemeDevice) -> str | None:
+    """Return the key a discovered device is indexed by."""
+    return device.mac or device.address
+
+
+def _create_device(name: str, mac: str, address: str, base_model: str) -> SensemeDevice:
+    """Create a device of the class matching the discovered model."""
+    device_class = DEVICE_CLASS_BY_MODEL.get(base_model, SensemeFan)
+    return device_class(name=name, mac=mac, address=address, base_model=base_model)
+
 
 class SensemeDiscoveryEndpoint:
     """High-level endpoint for SenseME Discovery protocol."""
 
-    # one receive queue for all endpoints
-    receive_queue: asyncio.Queue = asyncio.Queue()
+    def __init__(self, ip: str = None, receive_queue: asyncio.Queue | None = None):
+        """Initialize Senseme Discovery Endpoint.
 
-    def __init__(self, ip: str = None):
-        """Initialize Senseme Discovery Endpoint."""
+        Endpoints created with the same receive_queue share received responses.
+        """
+        if receive_queue is None:
+            receive_queue = asyncio.Queue(RECEIVE_QUEUE_SIZE)
+        self.receive_queue = receive_queue
         self.opened = False
         self.transport: asyncio.BaseTransport | None = None
         self.ip = ip
@@ -72,7 +138,10 @@ class SensemeDiscoveryEndpoint:
         self.opened = False
         if self.transport is None:
             return
-        self.receive_queue.put_nowait(None)  # tell receive() socket is closed
+        try:
+            self.receive_queue.put_nowait(None)  # tell receive() socket is closed
+        except asyncio.QueueFull:
+            pass  # receive() sees the closing transport once the queue drains
         if self.transport:
             self.transport.close()
 
@@ -84,10 +153,11 @@ class SensemeDiscoveryEndpoint:
             return True  # opened connection but no transport is closed
         return self.transport.is_closing()
 
-    async def receive(self) -> SensemeDevice | None:
-        """Wait for discovered device and return it.
+    async def receive_response(self) -> tuple[str, str, str, str] | None:
+        """Wait for a discovery response and return its fields.
 
-        Return None when the socket is closed.
+        Returns a (name, mac, address, base_model) tuple without creating
+        a device, or None when the socket is closed.
         This method is a coroutine.
         """
         assert self.transport is not None
@@ -97,45 +167,54 @@ class SensemeDiscoveryEndpoint:
             rsp = await self.receive_queue.get()
             if rsp is None:
                 return None
-            msg = rsp[0]
-            addr = rsp[1]
-            if len(msg) > 200 or len(msg) < 31:
-                continue
-            if msg[0] != "(" or msg[-1] != ")":
-                continue
-            msg = msg[1:-1]
-            msg_data = msg.split(";")
-            if len(msg_data) != 5:
-                continue
-            if msg_data[4].upper() in IGNORE_MODELS:
+            match, addr = rsp
+            msg = match.string
+            name, mac, base_model = (
+                field.decode("utf-8", "replace") for field in match.groups()
+            )
+            if base_model.upper() in IGNORE_MODELS:
                 _LOGGER.debug("Ignored '%s' on %s", msg, self.ip)
                 continue
             _LOGGER.debug("Received '%s' from %s on %s", msg, addr, self.ip)
-            device_type = DEVICE_TYPES.get(msg_data[4], "FAN")
-            if device_type == "FAN":
-                return SensemeFan(
-                    name=msg_data[0],
-                    mac=msg_data[3],
-                    address=addr,
-                    base_model=msg_data[4],
-                )
-            elif device_type == "LIGHT":
-                return SensemeLight(
-                    name=msg_data[0],
-                    mac=msg_data[3],
-                    address=addr,
-                    base_model=msg_data[4],
-                )
+            return name, mac, addr, base_model
+
+    async def receive(self) -> SensemeDevice | None:
+        """Wait for discovered device and return it.
+
+        Return None when the socket is closed.
+        This method is a coroutine.
+        """
+        rsp = await self.receive_response()
+        if rsp is None:
             return None
+        return _create_device(*rsp)
 
     def send_broadcast(self):
         """Send the SenseME Discovery broadcast packet."""
         if not self.is_closing():
-            data = b"<ALL;DEVICE;ID;GET>"
-            self.transport.sendto(data, ("<broadcast>", PORT))
+            self.transport.sendto(BROADCAST_PAYLOAD, BROADCAST_ADDRESS)
             _LOGGER.debug("Discovery broadcast on %s", self.ip)
 
 
+if sys.version_info >= (3, 11):
+
+    async def _async_receive(
+        endpoint: SensemeDiscoveryEndpoint, timeout: float
+    ) -> tuple[str, str, str, str] | None:
+        """Receive from endpoint, raise asyncio.TimeoutError after timeout."""
+        # timeout() reuses the current task where wait_for() creates a new one
+        async with asyncio.timeout(timeout):
+            return await endpoint.receive_response()
+
+else:
+
+    async def _async_receive(
+        endpoint: SensemeDiscoveryEndpoint, timeout: float
+    ) -> tuple[str, str, str, str] | None:
+        """Receive from endpoint, raise asyncio.TimeoutError after timeout."""
+        return await asyncio.wait_for(endpoint.receive_response(), timeout)
+
+
 class SensemeDiscoveryProtocol(asyncio.DatagramProtocol):
     """Datagram protocol for SenseME Discovery."""
 
@@ -159,18 +238,24 @@ class SensemeDiscoveryProtocol(asyncio.DatagramProtocol):
     # Datagram protocol methods
     def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
         """UDP packet received on SenseME Discovery Protocol."""
-        if data:
-            msg = data.decode("utf-8")
-            try:
-                self._endpoint.receive_queue.put_nowait((msg, addr[0]))
-            except asyncio.QueueFull:
-                _LOGGER.error("Receive queue full")
+        # drop packets that cannot be a response, including our own broadcast
+        if not 31 <= len(data) <= 200:
+            return
+        match = DISCOVERY_RE.fullmatch(data)
+        if match is None:
+            return
+        queue = self._endpoint.receive_queue
+        try:
+            queue.put_nowait((match, addr[0]))
+        except asyncio.QueueFull:
+            # keep the most recent responses
+            queue.get_nowait()
+            queue.put_nowait((match, addr[0]))
+            _LOGGER.debug("Receive queue full on %s", self._endpoint.ip)
 
     def error_received(self, exc):
         """Error on SenseME Discovery Protocol."""
-        _LOGGER.debug(
-            "Protocol error on %s\n%s", self._endpoint.ip, traceback.format_exc()
-        )
+        _LOGGER.debug("Protocol error on %s", self._endpoint.ip, exc_info=exc)
         self._endpoint.close()
 
 
@@ -181,29 +266,36 @@ class SensemeDiscovery:
     for response messages from SenseME devices by Big Ass Fans.
     """
 
-    _devices: list[
-        SensemeDevice
-    ] = []  # all SensemeDiscovery objects use the same device list
+    # all SensemeDiscovery objects use the same devices, indexed by MAC address
+    _devices: dict[str | None, SensemeDevice] = {}
 
     def __init__(self, start_first: bool = True, refresh_minutes: int = 5):
         """Initialize Senseme Discovery Protocol."""
         self.start_first = start_first
         self.refresh_minutes = refresh_minutes
         self._is_running = False
-        self._callbacks: list[Callable] = []
+        # maps each callback to whether it is a coroutine function
+        self._callbacks: dict[Callable, bool] = {}
         self._broadcaster_task = None
+        # new devices being started or queried, indexed like _devices
+        self._pending_tasks: dict[str | None, asyncio.Task] = {}
+        self._random = random.Random()  # jitter for the refresh interval
 
     @property
     def devices(self):
         """Get the current list of discovered devices."""
-        return self._devices
+        return list(self._devices.values())
+
+    @property
+    def has_pending_devices(self) -> bool:
+        """Return True while newly found devices are still being contacted."""
+        return bool(self._pending_tasks)
 
     async def async_add_by_device_info(self, info: dict[str, str]):
         """Add a device by IP address."""
-        for existing_device in self._devices:
-            if existing_device.mac == info["mac"]:
-                _LOGGER.debug("Did not add by device info. Device already exists")
-                return
+        if info["mac"] in self._devices:
+            _LOGGER.debug("Did not add by device info. Device already exists")
+            return
         status, device = await async_get_device_by_device_info(
             info=info,
             start_first=self.start_first,
@@ -220,27 +312,42 @@ class SensemeDiscovery:
 
     def _async_process_callbacks(self) -> None:
         """Callback devices when a new device is found."""
-        for callback in self._callbacks:
-            if inspect.iscoroutinefunction(callback):
-                asyncio.create_task(callback(self._devices.copy()))
+        devices = self.devices  # one snapshot shared by all callbacks
+        for callback, is_coroutine in tuple(self._callbacks.items()):
+            if is_coroutine:
+                asyncio.create_task(callback(devices))
             else:
-                callback(self._devices.copy())
+                callback(devices)
+
+    def _add_or_update_device(self, device: SensemeDevice) -> bool:
+        """Add or update a device.
 
-    def _add_or_update_device(self, device: SensemeDevice) -> None:
-        """Add or update a device."""
-        if device not in self._devices:
-            self._devices.append(device)
+        Returns True when the device was added or its address changed.
+        """
+        key = _device_key(device)
+        existing_device = self._devices.get(key)
+        if existing_device is None:
+            self._devices[key] = device
             _LOGGER.debug("Add by device info %s", device)
-            return
+            return True
         _LOGGER.debug("Did not add by device info. Device already exists")
-        for existing_device in self._devices:
-            if device == existing_device:
-                # Handle address changes
-                existing_device._address = device.address
+        return self._update_device_address(existing_device, device.address)
+
+    def _update_device_address(
+        self, device: SensemeDevice, address: str | None
+    ) -> bool:
+        """Update the address of a known device.
+
+        Returns True when the address changed.
+        """
+        if device._address == address:
+            return False
+        device._address = address
+        return True
 
     async def async_add_by_ip_address(self, address: str):
         """Add a device by IP address."""
-        for existing_device in self._devices:
+        for existing_device in self._devices.values():
             if existing_device.address == address:
                 _LOGGER.debug("Did not add by IP address. Device already exists")
                 return
@@ -252,7 +359,7 @@ class SensemeDiscovery:
                 "Add device by IP address failed. Unable to connect '%s'", address
             )
             return
-        if self.start_first and device not in self._devices:
+        if self.start_first and _device_key(device) not in self._devices:
             await device.async_update()
         self._add_or_update_device(device)
         self._async_process_callbacks()
@@ -263,18 +370,18 @@ class SensemeDiscovery:
         Called when parameters are updated.
         """
         if callback not in self._callbacks:
-            self._callbacks.append(callback)
-            if inspect.iscoroutinefunction(callback):
-                asyncio.create_task(callback(self._devices.copy()))
+            is_coroutine = inspect.iscoroutinefunction(callback)
+            self._callbacks[callback] = is_coroutine
+            if is_coroutine:
+                asyncio.create_task(callback(self.devices))
                 _LOGGER.debug("Added coroutine callback")
             else:
-                callback(self._devices.copy())
+                callback(self.devices)
                 _LOGGER.debug("Added function callback")
 
     def remove_callback(self, callback):
         """Remove existing callback function/coroutine."""
-        if callback in self._callbacks:
-            self._callbacks.remove(callback)
+        if self._callbacks.pop(callback, None) is not None:
             _LOGGER.debug("Removed callback")
 
     async def _create_endpoints(self):  # noqa: C901
@@ -282,51 +389,42 @@ class SensemeDiscovery:
         endpoints = []
         loop = asyncio.get_running_loop()
         listening = 0
-        ips = [
-            ip
-            for adapter in ifaddr.get_adapters()
-            for ip in adapter.ips
-            if ip.is_IPv4 and not ipaddress.ip_address(ip.ip).is_loopback
-        ]
-        for ip in ips:
-            _LOGGER.debug("Found IPv4 %s", ip.ip)
+        # one receive queue for all endpoints of this discovery
+        receive_queue: asyncio.Queue = asyncio.Queue(RECEIVE_QUEUE_SIZE)
+        for ip in _get_ipv4_addresses():
+            _LOGGER.debug("Found IPv4 %s", ip)
             try:
-                endpoint = SensemeDiscoveryEndpoint(ip.ip)
+                endpoint = SensemeDiscoveryEndpoint(ip, receive_queue)
                 await loop.create_datagram_endpoint(
-                    lambda ep=endpoint: SensemeDiscoveryProtocol(ep),
-                    local_addr=(ip.ip, PORT),
+                    partial(SensemeDiscoveryProtocol, endpoint),
+                    local_addr=(ip, PORT),
                     family=socket.AF_INET,
                     allow_broadcast=True,
                 )
                 endpoints.append(endpoint)
                 listening += 1
             except OSError as e:
+                # the adapters may have changed, enumerate them again next time
+                _clear_ipv4_addresses()
                 # borrowed this error handling from python-zeroconf
                 _errno = e.args[0]
-                err_einval = {errno.EINVAL}
-                if sys.platform == "win32":
-                    err_einval |= {errno.WSAEINVAL}
                 if _errno == errno.EADDRINUSE:
                     _LOGGER.debug(
                         "Unable to listen on %s. " "Address already in use",
-                        ip.ip,
+                        ip,
                     )
                 elif _errno == errno.EADDRNOTAVAIL:
                     _LOGGER.debug(
                         "Unable to listen on %s. " "Address not available",
-                        ip.ip,
+                        ip,
                     )
-                elif _errno in err_einval:
+                elif _errno in ERRNO_EINVAL:
                     _LOGGER.debug(
                         "Unable to listen on %s. " "Multicast not supported",
-                        ip.ip,
+                        ip,
                     )
                 else:
-                    _LOGGER.error(
-                        "Unable to listen on %s.\n%s",
-                        traceback.format_exc(),
-                        ip.ip,
-                    )
+                    _LOGGER.error("Unable to listen on %s.", ip, exc_info=True)
 
         if listening == 0:
             # failed to bind to any address
@@ -341,19 +439,18 @@ class SensemeDiscovery:
         This method is a coroutine.
         """
         self._is_running = True
-        device = None
+        loop = asyncio.get_running_loop()
+        endpoints: list[SensemeDiscoveryEndpoint] = []
         while True:
             try:
                 endpoints = await self._create_endpoints()
-                start = time.time()
+                start = loop.time()
                 while True:
                     try:
-                        device: SensemeDevice = await asyncio.wait_for(
-                            endpoints[0].receive(), 1
-                        )
+                        rsp = await _async_receive(endpoints[0], 1)
                     except asyncio.TimeoutError:
-                        device = None
-                        if time.time() - start < 5:
+                        rsp = None
+                        if loop.time() - start < 5:
                             for endpoint in endpoints:
                                 endpoint.send_broadcast()
                         else:
@@ -361,28 +458,23 @@ class SensemeDiscovery:
                                 endpoint.abort()
                             endpoints = []
                             break
-                    if device is None:
+                    if rsp is None:
                         continue
-                    if device in self._devices:
+                    name, mac, address, base_model = rsp
+                    key = mac or address
+                    existing_device = self._devices.get(key)
+                    if existing_device is not None:
                         # Check for ip change
-                        self._add_or_update_device(device)
-                    else:
-                        if self.start_first:
-                            if await device.async_update():
-                                self._add_or_update_device(device)
-                            else:
-                                _LOGGER.debug("Failed to start %s", device.name)
-                        else:
-                            if await device.async_fill_out_info():
-                                self._add_or_update_device(device)
-                            else:
-                                _LOGGER.debug(
-                                    "Failed to retrieve secondary info for %s",
-                                    device.name,
-                                )
-                    self._async_process_callbacks()
+                        if self._update_device_address(existing_device, address):
+                            self._async_process_callbacks()
+                    elif key not in self._pending_tasks:
+                        # new devices are contacted concurrently
+                        device = _create_device(name, mac, address, base_model)
+                        self._pending_tasks[key] = asyncio.create_task(
+                            self._async_add_new_device(device)
+                        )
                 await asyncio.sleep(1)
-                wait = self.refresh_minutes * 60 + random.uniform(-10, 10)
+                wait = self.refresh_minutes * 60 + self._random.uniform(-10, 10)
                 _LOGGER.debug("Currently %s known senseme devices", len(self._devices))
                 _LOGGER.debug("Discovery waiting for %s seconds", int(wait))
                 await asyncio.sleep(wait)
@@ -394,14 +486,41 @@ class SensemeDiscovery:
                 # _create_endpoints() already reported the error
                 return
             except Exception:
-                _LOGGER.error("Broadcaster task error\n%s", traceback.format_exc())
+                _LOGGER.error("Broadcaster task error", exc_info=True)
                 raise
             finally:
                 for endpoint in endpoints:
                     endpoint.abort()
-                endpoints = None
+                endpoints = []
         _LOGGER.error("Broadcaster task ended")
 
+    async def _async_add_new_device(self, device: SensemeDevice) -> None:
+        """Start or retrieve secondary info from a new device then add it.
+
+        This method is a coroutine.
+        """
+        key = _device_key(device)
+        try:
+            if self.start_first:
+                if not await device.async_update():
+                    _LOGGER.debug("Failed to start %s", device.name)
+                    device.stop()
+                    return
+            elif not await device.async_fill_out_info():
+                _LOGGER.debug("Failed to retrieve secondary info for %s", device.name)
+                return
+            if self._add_or_update_device(device):
+                self._async_process_callbacks()
+            if self._devices.get(key) is not device:
+                # an existing device was kept, do not leave this copy running
+                device.stop()
+        except asyncio.CancelledError:
+            # a device dropped here would otherwise keep reconnecting forever
+            device.stop()
+            raise
+        finally:
+            self._pending_tasks.pop(key, None)
+
     def start(self):
         """Start broadcaster task.
 
@@ -418,6 +537,8 @@ class SensemeDiscovery:
         if self._is_running is True:
             self._broadcaster_task.cancel()
             self._is_running = False
+        for task in self._pending_tasks.values():
+            task.cancel()
 
     def remove_discovered_devices(self):
         """Stop broadcaster task.
@@ -425,9 +546,9 @@ class SensemeDiscovery:
         Any discovered devices will be stopped and removed from memory.
         """
         self.stop()
-        for device in self._devices:
+        for device in self._devices.values():
             device.stop()
-        self._devices = []
+        self._devices = {}
 
 
 async def discover_all(timeout_seconds=5) -> bool:
@@ -436,16 +557,12 @@ async def discover_all(timeout_seconds=5) -> bool:
     This function will always take timeout_seconds to complete.
     This method is a coroutine.
     """
-    start = time.time()
     discovery = SensemeDiscovery(False)
     try:
+        # the broadcaster retrieves device information before adding a device
         discovery.start()
-        while True:
-            await asyncio.sleep(0.1)
-            for device in discovery.devices:
-                await device.async_fill_out_info()
-            if time.time() - start > timeout_seconds:
-                return discovery.devices.copy()
+        await asyncio.sleep(timeout_seconds)
+        return discovery.devices
     finally:
         count = len(discovery.devices)
         _LOGGER.debug("Discovered %s device%s", count, "" if count == 1 else "s")
@@ -474,23 +591,26 @@ async def discover(value, timeout_seconds=5) -> SensemeDevice | None:
     This function will take up timeout_seconds to complete.
     This method is a coroutine.
     """
-    start = time.time()
+    found: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def _async_check_devices(devices: list[SensemeDevice]) -> None:
+        for device in devices:
+            if device == value and not found.done():
+                found.set_result(device)
+
     discovery = SensemeDiscovery(False)
     try:
+        discovery.add_callback(_async_check_devices)
         discovery.start()
-        while True:
-            await asyncio.sleep(0.1)
-            devices = discovery.devices.copy()
-            for device in devices:
-                if device == value:
-                    await device.async_fill_out_info()
-                    device.start()
-                    await device.async_update()
-                    return device
-            if time.time() - start > timeout_seconds:
-                return None
+        device = await asyncio.wait_for(found, timeout_seconds)
+    except asyncio.TimeoutError:
+        return None
     finally:
+        discovery.remove_callback(_async_check_devices)
         discovery.stop()
+    device.start()
+    await device.async_update()
+    return device
 
 
 # pylint: disable=protected-access
@@ -516,28 +636,19 @@ async def async_get_device_by_ip_address(
     try:
         basedevice = SensemeDevice(address=address)
         if await asyncio.wait_for(basedevice.async_fill_out_info(), timeout_seconds):
-            if basedevice.device_type == "FAN":
-                device: SensemeFan | SensemeLight = SensemeFan(
-                    name=basedevice._name,
-                    mac=basedevice._mac,
-                    address=address,
-                    base_model=basedevice._base_model,
-                    refresh_minutes=refresh_minutes,
-                )
-            else:
-                device = SensemeLight(
-                    name=basedevice._name,
-                    mac=basedevice._mac,
-                    address=address,
-                    base_model=basedevice._base_model,
-                    refresh_minutes=refresh_minutes,
-                )
+            device = DEVICE_CLASSES[basedevice.device_type](
+                name=basedevice._name,
+                mac=basedevice._mac,
+                address=address,
+                base_model=basedevice._base_model,
+                refresh_minutes=refresh_minutes,
+            )
             device._uuid = basedevice._uuid
             device._room_name = basedevice._room_name
             device._room_type = basedevice._room_type
             device._has_light = basedevice._has_light
             device._has_sensor = basedevice._has_sensor
-            device._fw_name = basedevice._fw_name
+            device._handle_fw_name(basedevice._fw_name)
             device._fw_version = basedevice._fw_version
             device._data = basedevice._data
             device._first_update = basedevice._first_update
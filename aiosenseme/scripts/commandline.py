@@ -5,187 +5,250 @@ import argparse
 import asyncio
 import json
 import logging
-from typing import List
+import math
+import sys
+from typing import Any, List
 
 import aiosenseme
 from aiosenseme import SensemeDevice, SensemeDiscovery, __version__
 from aiosenseme.device import SensemeFan, SensemeLight
 
-ARGS = argparse.ArgumentParser(
-    description="Discover and control SenseME devices by Big Ass Fans."
-)
-ARGS.add_argument(
-    "-V",
-    "--version",
-    action="store_true",
-    dest="version",
-    default=False,
-    help="display version number",
-)
-ARGS.add_argument(
-    "--debug",
-    action="store_true",
-    dest="debug",
-    default=False,
-    help="enable debug level logging",
-)
-ARGS.add_argument(
-    "--listen",
-    action="store_true",
-    dest="listen",
-    default=False,
-    help="Connect to device and show changes to the fan",
-)
-ARGS.add_argument(
-    "-j",
-    "--json",
-    action="store_true",
-    dest="json",
-    default=False,
-    help="return device information and state as json",
-)
-ARGS.add_argument(
-    "-d",
-    "--discover",
-    action="store_true",
-    dest="discover",
-    default=False,
-    help="discover all SenseME devices on the network",
-)
-ARGS.add_argument(
-    "-m",
-    "--models",
-    action="store_true",
-    dest="models",
-    default=False,
-    help="list known SenseME device models",
-)
-ARGS.add_argument(
-    "-i",
-    "--ip",
-    action="store",
-    dest="ip",
-    default=None,
-    help="IP Address",
-)
-ARGS.add_argument(
-    "-n",
-    "--name",
-    action="store",
-    dest="name",
-    default=None,
-    help="SenseME device name",
-)
-ARGS.add_argument(
-    "-f",
-    "--fan",
-    action="store",
-    dest="fan",
-    default=None,
-    choices=["on", "off"],
-    help="fan power",
-)
-ARGS.add_argument(
-    "-s",
-    "--speed",
-    action="store",
-    dest="speed",
-    default=None,
-    type=int,
-    choices=range(1, 8),
-    help="fan speed",
-)
-ARGS.add_argument(
-    "-l",
-    "--light",
-    action="store",
-    dest="light",
-    default=None,
-    choices=["on", "off"],
-    help="light power",
-)
-ARGS.add_argument(
-    "-b",
-    "--brightness",
-    action="store",
-    dest="brightness",
-    default=None,
-    type=int,
-    choices=range(0, 17),
-    help="light brightness",
+
+def _color_temp(value: str) -> int:
+    """Convert a color temperature argument to a supported value."""
+    try:
+        color_temp = int(round(float(value) / 100.0)) * 100
+    except (ValueError, OverflowError) as err:
+        raise argparse.ArgumentTypeError(f"invalid color temperature: {value}") from err
+    return max(2200, min(5000, color_temp))
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """Return the command line argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Discover and control SenseME devices by Big Ass Fans."
+    )
+    parser.add_argument(
+        "-V",
+        "--version",
+        action="store_true",
+        dest="version",
+        default=False,
+        help="display version number",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        dest="debug",
+        default=False,
+        help="enable debug level logging",
+    )
+    parser.add_argument(
+        "--listen",
+        action="store_true",
+        dest="listen",
+        default=False,
+        help="Connect to device and show changes to the fan",
+    )
+    parser.add_argument(
+        "--listen-duration",
+        action="store",
+        dest="listen_duration",
+        default=None,
+        type=float,
+        help="stop listening after this many seconds",
+    )
+    parser.add_argument(
+        "-j",
+        "--json",
+        action="store_true",
+        dest="json",
+        default=False,
+        help="return device information and state as json",
+    )
+    parser.add_argument(
+        "-d",
+        "--discover",
+        action="store_true",
+        dest="discover",
+        default=False,
+        help="discover all SenseME devices on the network",
+    )
+    parser.add_argument(
+        "-m",
+        "--models",
+        action="store_true",
+        dest="models",
+        default=False,
+        help="list known SenseME device models",
+    )
+    parser.add_argument(
+        "-i",
+        "--ip",
+        action="store",
+        dest="ip",
+        default=None,
+        help="IP Address",
+    )
+    parser.add_argument(
+        "-n",
+        "--name",
+        action="store",
+        dest="name",
+        default=None,
+        help="SenseME device name",
+    )
+    parser.add_argument(
+        "-f",
+        "--fan",
+        action="store",
+        dest="fan",
+        default=None,
+        choices=["on", "off"],
+        help="fan power",
+    )
+    parser.add_argument(
+        "-s",
+        "--speed",
+        action="store",
+        dest="speed",
+        default=None,
+        type=int,
+        choices=range(1, 8),
+        help="fan speed",
+    )
+    parser.add_argument(
+        "-l",
+        "--light",
+        action="store",
+        dest="light",
+        default=None,
+        choices=["on", "off"],
+        help="light power",
+    )
+    parser.add_argument(
+        "-b",
+        "--brightness",
+        action="store",
+        dest="brightness",
+        default=None,
+        type=int,
+        choices=range(0, 17),
+        help="light brightness",
+    )
+    parser.add_argument(
+        "-c",
+        "--colortemp",
+        action="store",
+        dest="colortemp",
+        default=None,
+        type=_color_temp,
+        metavar="{2200-5000}",
+        help="light color temperature, rounded to 100",
+    )
+    parser.add_argument(
+        "-w",
+        "--whoosh",
+        action="store",
+        dest="whoosh",
+        default=None,
+        choices=["on", "off"],
+        help="fan whoosh mode",
+    )
+    return parser
+
+
+# device attributes reported by --json
+COMMON_ATTRS = (
+    "model",
+    "fw_version",
+    "device_indicators",
+    "device_beeper",
+    "network_ip",
+    "network_subnetmask",
+    "network_gateway",
+    "network_ssid",
+    "room_name",
+    "room_type",
+    "motion_detected",
+    "sleep_mode",
 )
-ARGS.add_argument(
-    "-c",
-    "--colortemp",
-    action="store",
-    dest="colortemp",
-    default=None,
-    type=int,
-    choices=range(2200, 5100, 100),
-    help="light color temperature",
+FAN_ATTRS = (
+    "fan_on",
+    "fan_speed",
+    "fan_speed_min",
+    "fan_speed_max",
+    "fan_speed_limits_room",
+    "fan_dir",
+    "fan_whoosh_mode",
+    "fan_autocomfort",
+    "fan_smartmode",
+    "fan_cooltemp",
+    "motion_fan_auto",
 )
-ARGS.add_argument(
-    "-w",
-    "--whoosh",
-    action="store",
-    dest="whoosh",
-    default=None,
-    choices=["on", "off"],
-    help="fan whoosh mode",
+LIGHT_ATTRS = ("light_color_temp", "light_color_temp_min", "light_color_temp_max")
+HAS_LIGHT_ATTRS = (
+    "light_on",
+    "light_brightness",
+    "light_brightness_min",
+    "light_brightness_max",
+    "light_brightness_limits_room",
+    "motion_light_auto",
 )
 
-# array of discovered devices
-_DEVICES = []
+# discovered devices, identified by MAC address
+_DEVICES: set[SensemeDevice] = set()
+
+
+def _device_attrs(device: SensemeDevice, attrs: tuple[str, ...]) -> dict:
+    """Return a dictionary of the named device attributes."""
+    return {attr: getattr(device, attr) for attr in attrs}
 
 
 def print_device(device: SensemeDevice):
     """Print information about a device."""
-    msg = f"{device.name}\n"
+    lines = [f"{device.name}"]
     if device.room_status:
-        msg += f"  Room Name: {device.room_name}, Room Type: {device.room_type}\n"
+        lines.append(f"  Room Name: {device.room_name}, Room Type: {device.room_type}")
     if device.is_fan:
-        if device.has_light:
-            msg += f"  Model: {device.model} with light, "
-        else:
-            msg += f"  Model: {device.model} without light, "
-    elif device.is_light:
-        msg += f"  Model: {device.model}, "
+        light = "with light" if device.has_light else "without light"
+        model = f"  Model: {device.model} {light}, "
     else:
-        msg += f"  Model: {device.model}, "
-    msg += f"FW Version: {device.fw_version}\n"
-    msg += f"  IP Addr: {device.address}, MAC Addr: {device.mac}\n"
-    msg += f"  UUID: {device.uuid}"
-    print(msg)
+        model = f"  Model: {device.model}, "
+    lines.append(f"{model}FW Version: {device.fw_version}")
+    lines.append(f"  IP Addr: {device.address}, MAC Addr: {device.mac}")
+    lines.append(f"  UUID: {device.uuid}")
+    print("\n".join(lines))
 
 
 def print_state(prefix: str, device: SensemeDevice):
     """Print information about a devices's current state."""
-    msg = prefix
+    parts = [prefix]
     if device.is_fan:
         assert isinstance(device, SensemeFan)
         if device.fan_on:
-            msg += f": Fan is on (speed: {device.fan_speed}"
+            parts.append(f": Fan is on (speed: {device.fan_speed}")
             if device.fan_whoosh_mode:
-                msg += ", whoosh mode is on"
-            msg += ")"
+                parts.append(", whoosh mode is on")
+            parts.append(")")
         else:
-            msg += ": Fan is off"
+            parts.append(": Fan is off")
         if device.light_on:
-            msg += f", Light is on (brightness: {device.light_brightness})"
+            parts.append(f", Light is on (brightness: {device.light_brightness})")
         else:
-            msg += ", Light is off"
+            parts.append(", Light is off")
         if device.sleep_mode:
-            msg += ", Sleep Mode is on"
+            parts.append(", Sleep Mode is on")
     elif device.is_light:
         assert isinstance(device, SensemeLight)
         if device.light_on:
-            msg += f": Light is on (brightness: {device.light_brightness}"
-            msg += f", color temp: {device.light_color_temp})"
+            parts.append(f": Light is on (brightness: {device.light_brightness}")
+            parts.append(f", color temp: {device.light_color_temp})")
         else:
-            msg += ": Light is off"
+            parts.append(": Light is off")
     else:
-        msg += ": Unknown SenseME device"
-    print(msg)
+        parts.append(": Unknown SenseME device")
+    print("".join(parts))
 
 
 async def discovered(devices: List[SensemeDevice]):
@@ -194,32 +257,107 @@ async def discovered(devices: List[SensemeDevice]):
     Called when discovery has detected a SenseME device.
     Each time a device is discovered all devices discovered are reported.
     """
-    global _DEVICES
     for device in devices:
         if device not in _DEVICES:
-            _DEVICES.append(device)
+            _DEVICES.add(device)
             print_device(device)
 
 
+def _set_attr(device: SensemeDevice, pending: dict, attr: str, value: Any):
+    """Set a device attribute and remember it in pending if it changes."""
+    if getattr(device, attr) != value:
+        pending[attr] = value
+    setattr(device, attr, value)
+
+
+async def _wait_for_state(device: SensemeDevice, expected: dict, timeout: float):
+    """Wait until the device reports the expected attribute values.
+
+    Gives up after timeout seconds.
+    This method is a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    updated = asyncio.Event()
+    device.add_callback(updated.set)
+    try:
+        while any(getattr(device, attr) != value for attr, value in expected.items()):
+            updated.clear()
+            try:
+                await asyncio.wait_for(updated.wait(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                return
+    finally:
+        device.remove_callback(updated.set)
+
+
+async def _wait_for_discovery(
+    discovery: SensemeDiscovery, timeout: float, quiet: float
+):
+    """Wait until discovery has found no new devices for quiet seconds.
+
+    Gives up after timeout seconds.
+    This method is a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    changed = asyncio.Event()
+
+    def _changed(devices: List[SensemeDevice]):
+        changed.set()
+
+    discovery.add_callback(_changed)
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            changed.clear()
+            try:
+                await asyncio.wait_for(changed.wait(), min(quiet, remaining))
+            except asyncio.TimeoutError:
+                if not discovery.has_pending_devices:
+                    return
+    finally:
+        discovery.remove_callback(_changed)
+
+
+async def listen(duration: float | None):
+    """Wait until interrupted or until duration seconds have passed.
+
+    Changes are logged by the device while waiting.
+    This method is a coroutine.
+    """
+    if sys.platform == "win32":
+        # the selector loop on Windows is not woken up by Ctrl-C
+        remaining = math.inf if duration is None else duration
+        while remaining > 0:
+            await asyncio.sleep(min(remaining, 1.0))
+            remaining -= 1.0
+        return
+    try:
+        await asyncio.wait_for(asyncio.Event().wait(), duration)
+    except asyncio.TimeoutError:
+        pass
+
+
 async def process_args():  # noqa: C901
     """Process command line arguments."""
     try:
         device = None
-        args = ARGS.parse_args()
+        args = _build_parser().parse_args()
         if args.debug or args.listen:
             logging.basicConfig(level=logging.DEBUG)
         if args.version is True:
-            print("aiosenseme %s" % __version__)
-            print("Copyright (C) 2021 by Mike Lawrence")
             print(
+                f"aiosenseme {__version__}\n"
+                "Copyright (C) 2021 by Mike Lawrence\n"
                 "This is free software. "
-                "You may redistribute copies of it under the terms"
-            )
-            print(
+                "You may redistribute copies of it under the terms\n"
                 "of the GNU General Public License "
-                "<http://www.gnu.org/licenses/gpl.html>."
+                "<http://www.gnu.org/licenses/gpl.html>.\n"
+                "There is NO WARRANTY, to the extent permitted by law."
             )
-            print("There is NO WARRANTY, to the extent permitted by law.")
             return
         if args.discover is True:
             try:
@@ -227,7 +365,7 @@ async def process_args():  # noqa: C901
                 discovery = SensemeDiscovery(start_first=True)
                 discovery.add_callback(discovered)
                 discovery.start()
-                await asyncio.sleep(5)
+                await _wait_for_discovery(discovery, 5, 2)
                 count = len(discovery.devices)
                 if count == 0:
                     print("Found no SenseME devices.")
@@ -241,15 +379,7 @@ async def process_args():  # noqa: C901
                 discovery.stop()
                 return
         if args.models is True:
-            msg = "Known SenseME models: "
-            first = True
-            for model in SensemeDevice.models():
-                if first:
-                    first = False
-                    msg += model
-                else:
-                    msg += ", " + model
-            print(msg)
+            print("Known SenseME models: " + ", ".join(SensemeDevice.models()))
             return
         if not args.name and not args.ip:
             print("You must specify a SenseME device by using -n/--name or -i/--ip")
@@ -268,70 +398,35 @@ async def process_args():  # noqa: C901
                 print(f"Name or Room '{args.name}' not found")
                 return
         if args.listen:
-            while True:
-                await asyncio.sleep(1.0)
+            await listen(args.listen_duration)
+            return
         if args.json:
             info = device.get_device_info
-            info["model"] = device.model
-            info["fw_version"] = device.fw_version
-            info["device_indicators"] = device.device_indicators
-            info["device_beeper"] = device.device_beeper
-            info["network_ip"] = device.network_ip
-            info["network_subnetmask"] = device.network_subnetmask
-            info["network_gateway"] = device.network_gateway
-            info["network_ssid"] = device.network_ssid
-            info["room_name"] = device.room_name
-            info["room_type"] = device.room_type
-            info["motion_detected"] = device.motion_detected
-            info["sleep_mode"] = device.sleep_mode
+            info.update(_device_attrs(device, COMMON_ATTRS))
             if device.is_fan:
-                info["fan_on"] = device.fan_on
-                info["fan_speed"] = device.fan_speed
-                info["fan_speed_min"] = device.fan_speed_min
-                info["fan_speed_max"] = device.fan_speed_max
-                info["fan_speed_limits_room"] = device.fan_speed_limits_room
-                info["fan_dir"] = device.fan_dir
-                info["fan_whoosh_mode"] = device.fan_whoosh_mode
-                info["fan_autocomfort"] = device.fan_autocomfort
-                info["fan_smartmode"] = device.fan_smartmode
-                info["fan_cooltemp"] = device.fan_cooltemp
-                info["motion_fan_auto"] = device.motion_fan_auto
+                info.update(_device_attrs(device, FAN_ATTRS))
             if device.is_light:
-                info["light_color_temp"] = device.light_color_temp
-                info["light_color_temp_min"] = device.light_color_temp_min
-                info["light_color_temp_max"] = device.light_color_temp_max
+                info.update(_device_attrs(device, LIGHT_ATTRS))
             if device.has_light:
-                info["light_on"] = device.light_on
-                info["light_brightness"] = device.light_brightness
-                info["light_brightness_min"] = device.light_brightness_min
-                info["light_brightness_max"] = device.light_brightness_max
-                info[
-                    "light_brightness_limits_room"
-                ] = device.light_brightness_limits_room
-                info["motion_light_auto"] = device.motion_light_auto
+                info.update(_device_attrs(device, HAS_LIGHT_ATTRS))
             print(json.dumps(info, sort_keys=True, indent=4))
             return
         print_device(device)
         print_state("State", device)
-        changed = False
+        # attributes expected to change and their new values
+        pending: dict[str, Any] = {}
         if device.is_fan:
             if args.whoosh is not None:
                 print(f"whoosh={args.whoosh}")
-                if device.fan_whoosh_mode != (args.whoosh == "on"):
-                    changed = True
-                device.fan_whoosh_mode = args.whoosh == "on"
+                _set_attr(device, pending, "fan_whoosh_mode", args.whoosh == "on")
             if args.speed is not None:
                 if args.fan is not None:
                     print(
                         "When specifying --fanspeed there is no " "reason to set --fan"
                     )
-                if device.fan_speed != args.speed:
-                    changed = True
-                device.fan_speed = args.speed
+                _set_attr(device, pending, "fan_speed", args.speed)
             elif args.fan is not None:
-                if device.fan_on != (args.fan == "on"):
-                    changed = True
-                device.fan_on = args.fan == "on"
+                _set_attr(device, pending, "fan_on", args.fan == "on")
             if device.has_light:
                 if args.colortemp is not None:
                     print("Fan lights do not have adjustable color temperature")
@@ -341,13 +436,9 @@ async def process_args():  # noqa: C901
                             "When specifying --brightness there is no "
                             "reason to set --light"
                         )
-                    if device.light_brightness != args.brightness:
-                        changed = True
-                    device.light_brightness = args.brightness
+                    _set_attr(device, pending, "light_brightness", args.brightness)
                 elif args.light is not None:
-                    if device.light_on != (args.light == "on"):
-                        changed = True
-                    device.light_on = args.light == "on"
+                    _set_attr(device, pending, "light_on", args.light == "on")
             else:
                 if (
                     args.brightness is not None
@@ -362,19 +453,13 @@ async def process_args():  # noqa: C901
                         "When specifying --brightness there is no "
                         "reason to set --light"
                     )
-                if device.light_brightness != args.brightness:
-                    changed = True
-                device.light_brightness = args.brightness
+                _set_attr(device, pending, "light_brightness", args.brightness)
             elif args.light is not None:
-                if device.light_on != (args.light == "on"):
-                    changed = True
-                device.light_on = args.light == "on"
+                _set_attr(device, pending, "light_on", args.light == "on")
             if args.colortemp is not None:
-                if device.light_color_temp != args.colortemp:
-                    changed = True
-                device.light_color_temp = args.colortemp
-        if changed:
-            await asyncio.sleep(1.0)
+                _set_attr(device, pending, "light_color_temp", args.colortemp)
+        if pending:
+            await _wait_for_state(device, pending, 1.0)
             print_state("New State", device)
     finally:
         if device is not None:
@@ -383,10 +468,15 @@ async def process_args():  # noqa: C901
 
 def cli():
     """Command line interface for SensemeDiscovery."""
-    task = asyncio.Task(process_args())
-    loop = asyncio.get_event_loop()
     try:
-        loop.run_until_complete(task)
+        import uvloop  # type: ignore
+    except ImportError:
+        run = asyncio.run
+    else:
+        # uvloop.run() only exists in uvloop 0.18 and later
+        run = getattr(uvloop, "run", None) or asyncio.run
+    try:
+        run(process_args())
     except KeyboardInterrupt:
         pass
 